@@ -3,4 +3,14 @@
 A python library to control Elgato's Avea Bulb.
 """
 __version__ = "1.5.2"
-from .avea import *
+# Not a star import : it would resolve AveaDelegate / AveaPeripheral, so import bluepy
+from .avea import (Bulb, discover_avea_bulbs, get_all_states, compute_brightness,
+                   compute_transition_table, compute_color, check_bounds)
+from . import avea as _avea
+
+__all__ = _avea.__all__
+
+
+def __getattr__(name):
+    """Forward the lazily imported bluepy classes (AveaDelegate, AveaPeripheral)"""
+    return getattr(_avea, name)
@@ -0,0 +1,56 @@
+"""
+Creator : k0rventen
+License : MIT
+Source  : https://github.com/k0rventen/avea
+Version : 1.5.2
+
+bluepy specific classes, kept apart so that bluepy is only imported when needed.
+"""
+
+# 3rd party imports
+import bluepy.btle  # for BLE transmission
+
+
+class AveaDelegate(bluepy.btle.DefaultDelegate):
+    """Overwrite of Bluepy's DefaultDelegate class
+
+    It adds a bulb object that refers to the Bulb.bulb object which
+    called this delegate.
+    It is used to call the bulb.process_notification() function
+    """
+
+    def __init__(self, bulbObject):
+        self.bulb = bulbObject
+
+    def handleNotification(self, cHandle, data):
+        """Overwrite of the async function called when a device sends a notification.
+
+        It's just passing the data to process_notification(),
+        which is linked to the emitting bulb (via self.bulb).
+        This allows us to use the bulb's functions and interact with the response.
+        It also flags the bulb as ready, so slow reads don't wait for a first notification,
+        and records which command was answered (see Bulb.fetch_state()).
+        """
+        self.bulb._ready = True
+        self.bulb._answered.add(data[0])
+        self.bulb.process_notification(data)
+
+
+class AveaPeripheral(bluepy.btle.Peripheral):
+    """Overwrite of the Bluepy 'Peripheral' class.
+
+    It overwrites only the default writeCharacteristic() method
+    """
+
+    def writeCharacteristic(self, handle, val, withResponse=False):
+        """Overwrite of the writeCharacteristic method
+
+        By default it only allows strings as input
+        As we craft our own paylod, we need to bypass this behavior
+        and send raw bytes (or an already hex-encoded string) directly
+        """
+        cmd = "wrr" if withResponse else "wr"
+        if isinstance(val, (bytes, bytearray)):
+            val = val.hex()
+        self._writeCmd(f"{cmd} {handle:X} {val}\n")
+        return self._getResp('wr')
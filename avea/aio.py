@@ -0,0 +1,529 @@
+"""
+Creator : k0rventen
+License : MIT
+Source  : https://github.com/k0rventen/avea
+Version : 1.5.2
+
+asyncio flavour of the library, built on top of bleak instead of bluepy.
+
+    import asyncio
+    from avea import aio
+
+    async def main():
+        bulbs = await aio.discover_avea_bulbs()
+        async with bulbs[0] as bulb:
+            await bulb.set_color(0, 4095, 0, 0)
+            await bulb.set_brightness(2000)
+
+    asyncio.run(main())
+"""
+
+# Standard imports
+import asyncio  # for the event loop
+import time  # for the scan cache
+
+# 3rd party imports
+from bleak import BleakClient, BleakScanner  # for BLE transmission
+
+# Local imports
+from .avea import (_BulbState, check_bounds, _brightness_payload, _color_payload,
+                   _transition_payloads, _clamp_rgb,
+                   _CMD_BRIGHTNESS, _CMD_COLOR, _CMD_NAME)
+
+# __all__ definition
+__all__ = ["AsyncBulb", "discover_avea_bulbs", "get_all_states"]
+
+# Characteristic used to talk to the bulb (handle 40 in the bluepy implementation)
+CONTROL_CHARACTERISTIC_UUID = "f815e811-456c-6761-746f-4d756e696368"
+
+# Standard Firmware Revision String characteristic
+FW_VERSION_CHARACTERISTIC_UUID = "00002a26-0000-1000-8000-00805f9b34fb"
+
+# Delay during which set_color() / set_brightness() calls are merged, in seconds
+COALESCE_DELAY = 0.02
+
+# (time of the last scan, its timeout, bulbs found), see discover_avea_bulbs()
+_last_scan = (None, 0, [])
+
+
+class AsyncBulb(_BulbState):
+    """The asyncio counterpart of the Bulb class
+
+    It exposes the same methods as Bulb, as coroutines, and talks to the bulb
+    through a bleak.BleakClient. Notifications are decoded by the code shared with Bulb.
+
+    Like Bulb, the connection is kept open between calls, until the bulb has been
+    idle for autodisconnect_after seconds (or after each call if persistent is False).
+    It can also be used as an async context manager, which holds the connection
+    for the duration of the block :
+
+        async with AsyncBulb("xx:xx:xx:xx:xx:xx") as bulb:
+            await bulb.set_rgb(255, 0, 0)
+    """
+
+    def __init__(self, address, persistent=True, autodisconnect_after=60, scan_timeout=10.0):
+        """Setup some vars
+
+        :args: - address : the bulb's address, or a bleak BLEDevice
+               - persistent, autodisconnect_after : see Bulb
+               - scan_timeout : how long to scan for the bulb when connecting, if only
+                 its address is known, in seconds (bleak's default)
+        """
+        super().__init__(getattr(address, "address", address))
+        # The bleak BLEDevice of the bulb, looked up on connection when only the address is known
+        self._device = address if hasattr(address, "address") else None
+        self.autodisconnect_after = autodisconnect_after
+        self.scan_timeout = scan_timeout
+        self._client = BleakClient(address)
+        self._sessions = 0  # number of async with blocks currently open
+        self._keep_alive = persistent
+        self._idle_task = None
+        self._busy = 0
+        self._connect_lock = None  # created on first use, so it belongs to the running loop
+        self._pending_color = None
+        self._pending_brightness = None
+        self._flush_future = None
+        self._wwr_supported = False
+
+    async def __aenter__(self):
+        self._sessions += 1
+        if not await self._ensure_connected():
+            self._sessions -= 1
+            raise ConnectionError("Could not connect to the Bulb")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._sessions -= 1
+        self._busy -= 1
+        # Nested blocks and calls made from other tasks keep the connection
+        if not self._sessions and not self._busy:
+            await self.disconnect()
+
+    async def connect(self):
+        """Connect to the bulb and subscribe to its notifications
+
+        :return: True if the connection is successful, false otherwise
+        """
+        # Created here so it belongs to the running loop
+        self._cmd_events = {cmd: asyncio.Event() for cmd in self._handlers}
+        if self._device is None:
+            self._device = await self._find_device()
+            if self._device is None:
+                print("Could not find the Bulb")
+                return False
+            self._client = BleakClient(self._device)
+        try:
+            await self._client.connect()
+            await self._client.start_notify(CONTROL_CHARACTERISTIC_UUID,
+                                            self._handle_notification)
+        except Exception:
+            print("Could not connect to the Bulb")
+            # The device may be stale, look it up again on the next connection
+            self._device = None
+            return False
+
+        # Checked once, so writes can skip the ACK round-trip when the bulb allows it
+        char = self._client.services.get_characteristic(CONTROL_CHARACTERISTIC_UUID)
+        self._wwr_supported = char is not None and "write-without-response" in char.properties
+        return True
+
+    async def _find_device(self):
+        """Return the BLEDevice of the bulb, or None if it can't be found
+
+        The bulbs of the last discover_avea_bulbs() scan are checked first, then a scan
+        of up to scan_timeout seconds looks for this address. The device is kept by
+        connect(), so reconnecting (e.g. after an idle disconnection) doesn't scan again.
+        """
+        for bulb in _last_scan[2]:
+            if bulb._device is not None and bulb.addr.upper() == self.addr.upper():
+                return bulb._device
+        return await BleakScanner.find_device_by_address(self.addr, timeout=self.scan_timeout)
+
+    async def disconnect(self):
+        """Disconnect from the bulb"""
+        self._cancel_idle_task()
+        try:
+            await self._client.disconnect()
+        except Exception:
+            pass
+
+    async def _ensure_connected(self):
+        """Connect to the bulb, unless it is already connected
+
+        Must be paired with a call to _release() when it returns True
+
+        :return: True if the bulb is connected, false otherwise
+        """
+        self._cancel_idle_task()
+        # Counted right away, so that no other task disconnects while this one connects
+        self._busy += 1
+        if not self._client.is_connected:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            # Concurrent calls wait for a single connect(), instead of each running one
+            async with self._connect_lock:
+                if not self._client.is_connected and not await self.connect():
+                    self._busy -= 1
+                    return False
+        return True
+
+    async def _release(self):
+        """Done with the connection for now, see Bulb._release()"""
+        self._busy -= 1
+        if self._sessions or self._busy:
+            return
+        if self._keep_alive:
+            self._idle_task = asyncio.ensure_future(self._disconnect_when_idle())
+        else:
+            await self.disconnect()
+
+    def _cancel_idle_task(self):
+        """Cancel the pending idle disconnection, if any"""
+        if self._idle_task is not None:
+            task, self._idle_task = self._idle_task, None
+            task.cancel()
+
+    async def _disconnect_when_idle(self):
+        """Disconnect after autodisconnect_after seconds without activity"""
+        try:
+            await asyncio.sleep(self.autodisconnect_after)
+        finally:
+            # Also reached when the loop shuts down and cancels this task,
+            # but not when the task was cancelled by _cancel_idle_task()
+            if self._idle_task is asyncio.current_task():
+                self._idle_task = None
+                await self.disconnect()
+
+    def _handle_notification(self, sender, data):
+        """Called by bleak when the bulb sends a notification"""
+        self.process_notification(bytes(data))
+        event = self._cmd_events.get(data[0])
+        if event is not None:
+            event.set()
+
+    async def _write(self, payload, response=None):
+        """Write a payload to the control characteristic
+
+        :args: - payload : bytes to write
+               - response : whether to wait for the bulb's ACK. By default, only
+                 when the characteristic doesn't support write-without-response
+        """
+        if response is None:
+            response = not self._wwr_supported
+        await self._client.write_gatt_char(CONTROL_CHARACTERISTIC_UUID,
+                                           payload, response)
+
+    async def _query(self, *commands):
+        """Send get commands and wait (up to 1s in total) for the bulb's answer to each of them
+
+        Each command has its own event, so notifications answering other commands don't end the wait
+        """
+        events = [self._cmd_events[command[0]] for command in commands]
+        for event in events:
+            event.clear()
+        for command in commands:
+            await self._write(command)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(event.wait() for event in events)), 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+    async def get_fw_version(self, refresh=False):
+        """Retrieve and return the current Firmware Revision of the bulb
+
+        The firmware version is only read once, unless refresh is True
+        """
+        if self._fw_cached and not refresh:
+            return self.fw_version
+
+        version = ""
+        if await self._ensure_connected():
+            try:
+                version = await self._client.read_gatt_char(FW_VERSION_CHARACTERISTIC_UUID)
+                version = bytes(version).decode("utf-8")
+            except Exception as e:
+                print(e, "get_fw_version")
+            finally:
+                await self._release()
+        self.fw_version = version
+        self._fw_cached = bool(version)
+        return version
+
+    async def _flush_soon(self):
+        """Wait until the pending color / brightness have been sent
+
+        The first call schedules the write COALESCE_DELAY seconds later, so the
+        calls made in the meantime only update the pending values, and all of
+        them return once the latest ones have been sent.
+        """
+        if self._flush_future is None:
+            self._flush_future = asyncio.ensure_future(self._flush())
+        await asyncio.shield(self._flush_future)
+
+    async def _flush(self):
+        """Send the latest pending color and brightness"""
+        await asyncio.sleep(COALESCE_DELAY)
+        self._flush_future = None
+        color, self._pending_color = self._pending_color, None
+        brightness, self._pending_brightness = self._pending_brightness, None
+        # Both values may have been superseded by direct writes in the meantime
+        if color is None and brightness is None:
+            return
+        if await self._ensure_connected():
+            try:
+                if color is not None:
+                    await self._write_color(*color)
+                if brightness is not None:
+                    await self._write_brightness(brightness)
+            finally:
+                await self._release()
+
+    async def set_brightness(self, brightness, coalesce=True):
+        """Send the specified brightness to the bulb
+
+        :args: - brightness value from 0 to 4095
+               - coalesce : merge the calls made within COALESCE_DELAY seconds,
+                 only sending the latest brightness. False to send it right away,
+                 dropping the pending one
+        """
+        brightness = check_bounds(brightness)
+        if coalesce:
+            self._pending_brightness = brightness
+            await self._flush_soon()
+        else:
+            # A pending brightness is older than this one, it must not be sent after it
+            self._pending_brightness = None
+            await self._write_brightness(brightness)
+
+    async def _write_brightness(self, brightness):
+        """Send a brightness already clamped between 0 and 4095, right away"""
+        if await self._ensure_connected():
+            try:
+                await self._write(_brightness_payload(brightness))
+                self._remember_brightness(brightness)
+            finally:
+                await self._release()
+
+    async def get_brightness(self, refresh=False):
+        """Retrieve and return the current brightness of the bulb
+
+        See Bulb.get_brightness() for the caching behaviour
+
+        :return: Current brightness, from 0 to 4095
+        """
+        if self._brightness_known and not refresh:
+            return self.brightness
+        if await self._ensure_connected():
+            try:
+                await self._query(_CMD_BRIGHTNESS)
+            finally:
+                await self._release()
+
+            return self.brightness
+
+    async def set_color(self, white, red, green, blue, coalesce=True):
+        """Set the color of the bulb using the full range of colors
+
+        :args: - white value from 0 to 4095
+               - red value
+               - green value
+               - blue value
+               - coalesce : merge the calls made within COALESCE_DELAY seconds,
+                 only sending the latest color. False to send it right away,
+                 dropping the pending one
+        """
+        white, red, green, blue = map(check_bounds, (white, red, green, blue))
+        await self._send_color(white, red, green, blue, coalesce)
+
+    async def _send_color(self, white, red, green, blue, coalesce):
+        """Send a color whose values are already clamped between 0 and 4095, see set_color()"""
+        if coalesce:
+            self._pending_color = (white, red, green, blue)
+            await self._flush_soon()
+        else:
+            # A pending color is older than this one, it must not be sent after it
+            self._pending_color = None
+            await self._write_color(white, red, green, blue)
+
+    async def _write_color(self, white, red, green, blue):
+        """Send a color already clamped between 0 and 4095, right away"""
+        if await self._ensure_connected():
+            try:
+                await self._write(_color_payload(white, red, green, blue))
+                self._remember_color(white, red, green, blue)
+            finally:
+                await self._release()
+
+    async def set_state(self, white, red, green, blue, brightness):
+        """Set both the color and the brightness of the bulb in one go
+
+        :args: - white value from 0 to 4095
+               - red value
+               - green value
+               - blue value
+               - brightness value from 0 to 4095
+        """
+        white, red, green, blue = map(check_bounds, (white, red, green, blue))
+        brightness = check_bounds(brightness)
+        self._pending_color = self._pending_brightness = None
+        if await self._ensure_connected():
+            try:
+                await self._write(_color_payload(white, red, green, blue))
+                self._remember_color(white, red, green, blue)
+                await self._write(_brightness_payload(brightness))
+                self._remember_brightness(brightness)
+            finally:
+                await self._release()
+
+    async def set_rgb(self, red, green, blue, coalesce=True):
+        """Set the color of the bulb in a RGB format
+
+        :args: - red value
+               - green value
+               - blue value
+               - coalesce : see set_color()
+        """
+        # Clamped to 0..255 first, so the shifted values are always within 0..4080
+        await self._send_color(0, _clamp_rgb(red) << 4, _clamp_rgb(green) << 4,
+                               _clamp_rgb(blue) << 4, coalesce)
+
+    async def set_smooth_transition(self, target_red, target_green, target_blue, duration=2, fps=60):
+        """Transition smoothly between the current color and a given target color
+
+        See Bulb.set_smooth_transition()
+        Frames are sent without response when possible, and the last one
+        with a response, as a barrier ensuring the whole transition went through.
+        """
+        self._pending_color = None
+        try:
+            init_r, init_g, init_b = await self.get_rgb()
+        except Exception:
+            print("Could not connect to bulb")
+            return
+        if not await self._ensure_connected():
+            return
+        try:
+            iterations = max(1, int(duration*fps))
+            interval = 1/fps
+
+            targets = (_clamp_rgb(target_red), _clamp_rgb(target_green), _clamp_rgb(target_blue))
+            payloads = _transition_payloads((init_r, init_g, init_b), targets, iterations)
+
+            write = self._client.write_gatt_char
+            frame_response = not self._wwr_supported
+            last = len(payloads) - 1
+            previous = None
+            for i, payload in enumerate(payloads):
+                # the bulb already shows a frame identical to the previous one
+                if payload != previous or i == last:
+                    await write(CONTROL_CHARACTERISTIC_UUID, payload,
+                                i == last or frame_response)
+                previous = payload
+                await asyncio.sleep(interval)
+            self._remember_color(0, *(target << 4 for target in targets))
+        finally:
+            await self._release()
+
+    async def get_color(self, refresh=False):
+        """Retrieve and return the current color of the bulb
+
+        See Bulb.get_color() for the caching behaviour
+
+        :returns: tuple (white, red, green, blue) with values from 0 to 4095
+        """
+        if self._color_known and not refresh:
+            return self.white, self.red, self.green, self.blue
+        if await self._ensure_connected():
+            try:
+                await self._query(_CMD_COLOR)
+            finally:
+                await self._release()
+
+            return self.white, self.red, self.green, self.blue
+
+    async def get_rgb(self, refresh=False):
+        """Retrieve and return the current color of the bulb in a RGB style
+
+        :returns: tuple (red, green, blue) with values from 0 to 255
+        """
+        if await self.get_color(refresh) is not None:
+            return self.red >> 4, self.green >> 4, self.blue >> 4
+
+    async def get_name(self, refresh=False):
+        """Get and return the name of the bulb
+
+        The name is only queried once, unless refresh is True
+
+        :returns: Name of the bulb
+        """
+        if self._name_cached and not refresh:
+            return self.name
+        if await self._ensure_connected():
+            try:
+                await self._query(_CMD_NAME)
+            finally:
+                await self._release()
+
+            return self.name
+
+    async def fetch_state(self):
+        """Retrieve the color, brightness and name of the bulb in one go
+
+        See Bulb.fetch_state()
+
+        :returns: tuple ((white, red, green, blue), brightness, name)
+        """
+        if await self._ensure_connected():
+            try:
+                await self._query(_CMD_BRIGHTNESS, _CMD_COLOR, _CMD_NAME)
+            finally:
+                await self._release()
+
+            return (self.white, self.red, self.green, self.blue), self.brightness, self.name
+
+    async def set_name(self, name):
+        """Set the name of the bulb"""
+        if await self._ensure_connected():
+            try:
+                await self._write(_CMD_NAME + name.encode("utf-8"))
+                self.name = name
+                self._name_cached = True
+            finally:
+                await self._release()
+
+
+async def discover_avea_bulbs(timeout=4.0, max_age=10.0):
+    """Scanning feature
+
+    Scan the BLE neighborhood for Avea bulbs, recognized by their advertised name
+    The result of a scan that found bulbs is reused by the calls made in the following
+    max_age seconds, unless they ask for a longer scan
+
+    :args: - timeout : duration of the scan in seconds, defaults to 4
+           - max_age : how long a scan result is reused, in seconds. 0 to always scan
+    Returns the list of nearby bulbs, as AsyncBulb objects
+    """
+    global _last_scan
+    scanned_at, scanned_for, bulbs = _last_scan
+    if (scanned_at is not None and timeout <= scanned_for
+            and time.monotonic() - scanned_at < max_age):
+        return list(bulbs)
+
+    devices = await BleakScanner.discover(timeout=timeout)
+    bulbs = [AsyncBulb(dev) for dev in devices if dev.name and dev.name.startswith("Avea")]
+    # An empty result is not kept, so that a retry scans again
+    _last_scan = (time.monotonic(), timeout, bulbs) if bulbs else (None, 0, [])
+    return list(bulbs)
+
+
+async def get_all_states(bulbs, refresh=False):
+    """Retrieve the color of several bulbs concurrently
+
+    The asyncio counterpart of avea.get_all_states(), running every get_color()
+    on the current event loop instead of in a thread pool.
+
+    :args: - bulbs : list of AsyncBulb objects
+           - refresh : passed to get_color()
+    :returns: list of (white, red, green, blue) tuples, in the same order as bulbs
+    """
+    return list(await asyncio.gather(*(bulb.get_color(refresh) for bulb in bulbs)))
@@ -6,26 +6,114 @@ Version : 1.5.2
 """
 
 # Standard imports
+import concurrent.futures  # for parallel reads
+import contextlib  # for sessions
+import functools  # for caching
+import numbers  # for values validation
+import struct  # for payload packing
+import threading  # for locks and idle timers
 import time  # for delays
 
-# 3rd party imports
-import bluepy  # for BLE transmission
+# bluepy is only imported when talking to a bulb, so that the compute_*
+# helpers can be used without loading it (see __getattr__ below)
 
 # __all__ definition for __init__.py
-__all__ = ["Bulb", "discover_avea_bulbs", "compute_brightness", "compute_transition_table",
-           "compute_color", "check_bounds", "AveaDelegate", "AveaPeripheral"]
+# AveaDelegate and AveaPeripheral are resolved on demand by __getattr__ below
+__all__ = ["Bulb", "discover_avea_bulbs", "get_all_states", "compute_brightness",
+           "compute_transition_table", "compute_color", "check_bounds",
+           "AveaDelegate", "AveaPeripheral"]
 
+# Handle of the characteristic used to talk to the bulb
+_CONTROL_HANDLE = 40
 
-class Bulb:
-    """The class that represents an Avea bulb
+# Command bytes (also used as "get" requests on their own)
+_CMD_BRIGHTNESS = b"\x57"
+_CMD_COLOR = b"\x35"
+_CMD_NAME = b"\x58"
 
-    An Bulb object describe a real world Avea bulb.
-    It is linked to an AveaPeripheral object for BLE transmissions
-    and an AveaDelegate for BLE notifications handling.
+# Color command : cmd, fading (0x0111), unknow (0x000a), then the white, red,
+# green and blue values, all as little-endian u16
+_COLOR_STRUCT = struct.Struct("<BHHHHHH")
+_COLOR_FADING = 0x0111
+_COLOR_UNKNOW = 0x000a
+
+# The white, red, green and blue values alone, at offset 5 of a color command
+_COLOR_VALUES_STRUCT = struct.Struct("<4H")
+
+# Color notification : white, blue, green and red values, as the last 4 little-endian u16
+_unpack_color = struct.Struct("<4H").unpack_from
+
+# Brightness command : cmd, then the brightness as a little-endian u16
+_BRIGHTNESS_STRUCT = struct.Struct("<BH")
+
+# (time of the last scan, its timeout, bulbs found), see discover_avea_bulbs()
+_last_scan = (None, 0, [])
+
+
+class _IdleTimers:
+    """Run the idle disconnections of every bulb from a single thread
+
+    Instead of one threading.Timer (so one OS thread) per idle bulb, the deadlines
+    are kept here and awaited by one daemon thread. The thread is started when a
+    deadline is added, and stops once there are none left.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._deadlines = {}  # bulb -> time.monotonic() of its disconnection
+        self._thread = None
+
+    def schedule(self, bulb, delay):
+        """Call bulb._idle_disconnect() in delay seconds, replacing any pending call"""
+        with self._cond:
+            self._deadlines[bulb] = time.monotonic() + delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, bulb):
+        """Cancel the pending call for this bulb, if any"""
+        with self._cond:
+            self._deadlines.pop(bulb, None)
+
+    def _run(self):
+        """Wait for the next deadline, then disconnect the bulbs that are due"""
+        with self._cond:
+            while self._deadlines:
+                now = time.monotonic()
+                due = [bulb for bulb, deadline in self._deadlines.items() if deadline <= now]
+                if not due:
+                    self._cond.wait(min(self._deadlines.values()) - now)
+                    continue
+                for bulb in due:
+                    del self._deadlines[bulb]
+                # _idle_disconnect() takes the bulb's lock, which is held while
+                # calling schedule() / cancel() : don't hold ours at the same time
+                self._cond.release()
+                try:
+                    for bulb in due:
+                        bulb._idle_disconnect()
+                finally:
+                    self._cond.acquire()
+            self._thread = None
+
+
+_idle_timers = _IdleTimers()
+
+
+class _BulbState:
+    """The values known about an Avea bulb, shared by Bulb and aio.AsyncBulb
+
+    It decodes the bulb's notifications into these values, and keeps the ones
+    written to the bulb, whatever the BLE library used to talk to it.
     """
 
     def __init__(self, address):
-        """ Just setup some vars"""
+        """Setup the values, all unknown for now
+
+        :args: - address : the bulb's address
+        """
         self.addr = address
         self.name = "Unknown"
         self.fw_version = "Unknown"
@@ -35,6 +123,92 @@ class Bulb:
         self.brightness = 0
         self.white = 0
 
+        # Whether the values above are known, so getters can skip a BLE round-trip
+        self._fw_cached = False
+        self._name_cached = False
+        self._color_known = False
+        self._brightness_known = False
+
+        # Notification command byte -> handler, see process_notification()
+        self._handlers = {0x57: self._on_brightness, 0x35: self._on_color, 0x58: self._on_name}
+
+    def _remember_color(self, white, red, green, blue):
+        """Keep the color that was just sent to the bulb, already clamped with check_bounds()"""
+        self.white, self.red, self.green, self.blue = white, red, green, blue
+        self._color_known = True
+
+    def _remember_brightness(self, brightness):
+        """Keep the brightness that was just sent to the bulb, already clamped with check_bounds()"""
+        self.brightness = brightness
+        self._brightness_known = True
+
+    def process_notification(self, data):
+        """Method called when a notification is send from the bulb
+
+        It is processed here rather than in the handleNotification() function (or the
+        bleak callback), because the latter is not a method of the bulb class, therefore
+        it can't access the bulb object's data
+
+        :args: - data : the received data from the bulb in hex format
+        """
+        handler = self._handlers.get(data[0])
+        if handler is not None:
+            handler(data[1:])
+
+    def _on_brightness(self, values):
+        """Convert the brightness value"""
+        self.brightness = int.from_bytes(values, 'little')
+        self._brightness_known = True
+
+    def _on_color(self, values):
+        """Convert the color values, stored as the last 4 little-endian u16 : white, blue, green, red"""
+        if len(values) < 8:
+            return
+        white, blue, green, red = _unpack_color(values, len(values) - 8)
+        self.red = red ^ 0x3000
+        self.green = green ^ 0x2000
+        self.blue = blue ^ 0x1000
+        self.white = white
+        self._color_known = True
+
+    def _on_name(self, values):
+        """Convert the name"""
+        self.name = values.decode("utf-8")
+        self._name_cached = True
+
+
+class Bulb(_BulbState):
+    """The class that represents an Avea bulb
+
+    An Bulb object describe a real world Avea bulb.
+    It is linked to an AveaPeripheral object for BLE transmissions
+    and an AveaDelegate for BLE notifications handling.
+    """
+
+    def __init__(self, address, persistent=True, autodisconnect_after=60):
+        """Setup some vars, and the Peripheral / Delegate pair reused by every connection
+
+        :args: - address : the bulb's address
+               - persistent : keep the connection open between calls, until the bulb
+                 has been idle for autodisconnect_after seconds. If False, each call
+                 connects and disconnects from the bulb
+               - autodisconnect_after : idle time in seconds before disconnecting
+        """
+        super().__init__(address)
+        self.autodisconnect_after = autodisconnect_after
+        self._connected = False
+        self._sessions = 0  # number of session() blocks currently open
+        self._keep_alive = persistent
+        self._busy = 0
+        self._lock = threading.RLock()
+        self._ready = False  # whether the bulb sent a notification on this connection
+        self._answered = set()
+
+        from ._bluepy import AveaPeripheral, AveaDelegate
+        self.bulb = AveaPeripheral()
+        self.delegate = AveaDelegate(self)
+        self.bulb.withDelegate(self.delegate)
+
     def subscribe_to_notification(self):
         """Subscribe to the bulbs notifications
 
@@ -46,15 +220,12 @@ class Bulb:
     def connect(self):
         """Connect to the bulb
 
-        - Create a modified bluepy.btle.Peripheral object (see AveaPeripheral)
-        - Connect to the bulb
-        - Add a delegate for notifications
+        - Connect the bulb's AveaPeripheral (created once in __init__)
         - Send the "enable bit" for notifications
 
         :return: True if the connection is successful, false otherwise
         """
-        self.bulb = AveaPeripheral()
-        self.delegate = AveaDelegate(self)
+        self._ready = False
 
         # Catch if the bulb does not respond instead of crashing the whole script
         try:
@@ -63,56 +234,149 @@ class Bulb:
             print("Could not connect to the Bulb")
             return False
 
-        self.bulb.withDelegate(self.delegate)
         self.subscribe_to_notification()
+        self._connected = True
         return True
+
+    @contextlib.contextmanager
+    def session(self):
+        """Keep the bulb connected for the duration of a with block
+
+        Every method called on the bulb inside the block reuses the same
+        connection, instead of connecting and disconnecting each time :
+
+            with bulb.session():
+                bulb.set_color(0, 4095, 0, 0)
+                bulb.set_brightness(2000)
+
+        :returns: True if the connection is successful, false otherwise
+        """
+        with self._lock:
+            self._sessions += 1
+        connected = self._ensure_connected()
+        try:
+            yield connected
+        finally:
+            with self._lock:
+                self._sessions -= 1
+                if connected:
+                    self._busy -= 1
+                # Nested sessions and calls made from other threads keep the connection
+                if not self._sessions and not self._busy:
+                    self.disconnect()
+
+    def _ensure_connected(self):
+        """Connect to the bulb, unless it is already connected
+
+        Must be paired with a call to _release() when it returns True
+
+        :return: True if the bulb is connected, false otherwise
+        """
+        with self._lock:
+            self._cancel_idle_timer()
+            if self._connected or self.connect():
+                self._busy += 1
+                return True
+            return False
+
+    def _release(self):
+        """Done with the connection for now
+
+        Inside a session() or while another call uses the bulb, nothing happens.
+        Otherwise, a persistent bulb disconnects after autodisconnect_after seconds
+        of inactivity, and a non persistent one right away.
+        """
+        with self._lock:
+            self._busy -= 1
+            if self._sessions or self._busy:
+                return
+            if self._keep_alive:
+                _idle_timers.schedule(self, self.autodisconnect_after)
+            else:
+                self.disconnect()
+
+    def _cancel_idle_timer(self):
+        """Cancel the pending idle disconnection, if any"""
+        _idle_timers.cancel(self)
+    
+    def _idle_disconnect(self):
+        """Called by the idle timer, disconnect if the bulb is still unused"""
+        with self._lock:
+            if not self._busy and not self._sessions:
+                self.disconnect()
     
-    def get_fw_version(self):
-        """Retrieve and return the current Firmware Revision of the bulb"""
+    def get_fw_version(self, refresh=False):
+        """Retrieve and return the current Firmware Revision of the bulb
+
+        The firmware version is only read once, unless refresh is True
+        """
+        if self._fw_cached and not refresh:
+            return self.fw_version
+
+        from bluepy.btle import AssignedNumbers, BTLEException
+
         version = ""
-        if self.connect():
+        if self._ensure_connected():
             try:
-                c = self.bulb.getCharacteristics(uuid=bluepy.btle.AssignedNumbers.firmwareRevisionString)
+                c = self.bulb.getCharacteristics(uuid=AssignedNumbers.firmwareRevisionString)
                 version = c[0].read()
-            except (bluepy.btle.BTLEException, BrokenPipeError, AttributeError) as e:
+            except (BTLEException, BrokenPipeError, AttributeError) as e:
                 print(e, "get_fw_version")
+                self.disconnect()
+            finally:
+                self._release()
             if type(version) is bytes:
                 version = version.decode("utf-8")
-        self.fw_version = version;
+        self.fw_version = version
+        self._fw_cached = bool(version)
         return version
 
     def disconnect(self):
         """Disconnect from the bulb
 
-        Cleanup properly the bluepy's Peripheral and the Notification's Delegate to avoid weird issues
+        The Peripheral and its Delegate are kept, so the next connect() can reuse them
+        Does nothing if the bulb is not connected
         """
-        try:
-            self.bulb.disconnect()
-        except Exception:
-            pass
-        del self.bulb
-        del self.delegate
+        with self._lock:
+            self._cancel_idle_timer()
+            if not self._connected:
+                return
+            try:
+                self.bulb.disconnect()
+            except Exception:
+                pass
+            self._connected = False
 
     def set_brightness(self, brightness):
         """Send the specified brightness to the bulb
 
         :args: - brightness value from 0 to 4095
         """
-        if self.connect():
-            self.bulb.writeCharacteristic(
-                40, compute_brightness(check_bounds(brightness)))
-            self.disconnect()
+        brightness = check_bounds(brightness)
+        if self._ensure_connected():
+            try:
+                self._write(_brightness_payload(brightness))
+                self._remember_brightness(brightness)
+            finally:
+                self._release()
 
-    def get_brightness(self):
+    def get_brightness(self, refresh=False, slow=False):
         """Retrieve and return the current brightness of the bulb
 
+        The bulb is only queried if the brightness isn't already known
+        (from a previous get or set), or if refresh is True
+
+        :args: - refresh : query the bulb even if the brightness is known
+               - slow : see get_color()
         :return: Current brightness, from 0 to 4095
         """
-        if self.connect():
-            time.sleep(0.5)
-            self.bulb.writeCharacteristic(40, "57")
-            self.bulb.waitForNotifications(1.0)
-            self.disconnect()
+        if self._brightness_known and not refresh:
+            return self.brightness
+        if self._ensure_connected():
+            try:
+                self._query(_CMD_BRIGHTNESS, slow=slow)
+            finally:
+                self._release()
 
             return self.brightness
 
@@ -124,13 +388,35 @@ class Bulb:
                - green value
                - blue value
         """
-        if self.connect():
-            self.bulb.writeCharacteristic(40, compute_color(check_bounds(white),
-                                                            check_bounds(red),
-                                                            check_bounds(
-                                                                green),
-                                                            check_bounds(blue)))
-            self.disconnect()
+        white, red, green, blue = map(check_bounds, (white, red, green, blue))
+        if self._ensure_connected():
+            try:
+                self._write(_color_payload(white, red, green, blue))
+                self._remember_color(white, red, green, blue)
+            finally:
+                self._release()
+
+    def set_state(self, white, red, green, blue, brightness):
+        """Set both the color and the brightness of the bulb in one go
+
+        Both commands are sent back-to-back over a single connection.
+
+        :args: - white value from 0 to 4095
+               - red value
+               - green value
+               - blue value
+               - brightness value from 0 to 4095
+        """
+        white, red, green, blue = map(check_bounds, (white, red, green, blue))
+        brightness = check_bounds(brightness)
+        if self._ensure_connected():
+            try:
+                self._write(_color_payload(white, red, green, blue))
+                self._remember_color(white, red, green, blue)
+                self._write(_brightness_payload(brightness))
+                self._remember_brightness(brightness)
+            finally:
+                self._release()
 
     def set_rgb(self, red, green, blue):
         """Set the color of the bulb in a RGB format
@@ -139,14 +425,14 @@ class Bulb:
                - green value
                - blue value
         """
-        if self.connect():
-            self.bulb.writeCharacteristic(40, compute_color(check_bounds(0),
-                                                            check_bounds(
-                                                                red*16),
-                                                            check_bounds(
-                                                                green*16),
-                                                            check_bounds(blue*16)))
-            self.disconnect()
+        # Clamped to 0..255 first, so the shifted values are always within 0..4080
+        red, green, blue = _clamp_rgb(red) << 4, _clamp_rgb(green) << 4, _clamp_rgb(blue) << 4
+        if self._ensure_connected():
+            try:
+                self._write(_color_payload(0, red, green, blue))
+                self._remember_color(0, red, green, blue)
+            finally:
+                self._release()
 
 
     def set_smooth_transition(self, target_red, target_green, target_blue, duration=2, fps=60):
@@ -169,127 +455,173 @@ class Bulb:
         except Exception:
             print("Could not connect to bulb")
             return
-        if self.connect():
-
-            # compute iters & interval
-            
-            iterations = duration*fps
+        if not self._ensure_connected():
+            return
+        try:
+            # compute iters & interval, with at least one frame to reach the target
+            iterations = max(1, int(duration*fps))
             interval = 1/fps
 
-            # Compute the tables
-            transition_table_red = compute_transition_table(
-                init_r, target_red, iterations)
-            transition_table_green = compute_transition_table(
-                init_g, target_green, iterations)
-            transition_table_blue = compute_transition_table(
-                init_b, target_blue, iterations)
+            # Compute the tables, then every payload before sending anything
+            targets = (_clamp_rgb(target_red), _clamp_rgb(target_green), _clamp_rgb(target_blue))
+            payloads = _transition_payloads((init_r, init_g, init_b), targets, iterations)
 
             # Loopy loop
-            for i in range(iterations):
-                
-                val = compute_color(check_bounds(0),check_bounds(transition_table_red[i]*16),check_bounds(transition_table_green[i]*16),check_bounds(transition_table_blue[i]*16))
-                try:
-                    self.bulb.writeCharacteristic(40,val)
-                except Exception:
-                    self.disconnect()
-                    self.connect()
+            last = len(payloads) - 1
+            previous = None
+            for i, val in enumerate(payloads):
+                # the bulb already shows a frame identical to the previous one
+                if val != previous or i == last:
+                    try:
+                        # the last frame waits for the bulb's ACK
+                        self._write(val, withResponse=(i == last))
+                    except Exception:
+                        self.connect()
+                previous = val
                 time.sleep(interval)
-            self.disconnect()
+            self._remember_color(0, *(target << 4 for target in targets))
+        finally:
+            self._release()
 
 
-    def get_color(self):
+    def get_color(self, refresh=False, slow=False):
         """Retrieve and return the current color of the bulb
 
-        A .5s sleep is here to accommodate for the bulb's response time :
-        If get_color() is called directly after set_color(), the transmission
-        from the bulb may not be complete and the function may return old/garbage data
+        The bulb is only queried if the color isn't already known
+        (from a previous get or set), or if refresh is True.
+
+        The query is sent right away, and the answer to this very query is awaited.
+        Some bulbs may need a moment after connecting before answering : with slow=True,
+        if the bulb hasn't sent any notification on this connection yet, up to .5s is
+        waited for one first.
 
         :returns: tuple (white, red, green, blue) with values from 0 to 4095
         """
-        if self.connect():
-            time.sleep(0.5)
-            self.bulb.writeCharacteristic(40, "35")
-            self.bulb.waitForNotifications(1.0)
-            self.disconnect()
+        if self._color_known and not refresh:
+            return self.white, self.red, self.green, self.blue
+        if self._ensure_connected():
+            try:
+                self._query(_CMD_COLOR, slow=slow)
+            finally:
+                self._release()
 
             return self.white, self.red, self.green, self.blue
 
-    def get_rgb(self):
+    def get_rgb(self, refresh=False, slow=False):
         """Retrieve and return the current color of the bulb in a RGB style
 
+        See get_color() for the caching behaviour and slow
+
         :returns: tuple (red, green, blue) with values from 0 to 255
         """
-        if self.connect():
-            time.sleep(0.5)
-            self.bulb.writeCharacteristic(40, "35")
-            self.bulb.waitForNotifications(1.0)
-            self.disconnect()
-
-            return int(self.red/16), int(self.green/16), int(self.blue/16)
+        if self.get_color(refresh, slow) is not None:
+            return self.red >> 4, self.green >> 4, self.blue >> 4
 
-    def get_name(self):
+    def get_name(self, refresh=False, slow=False):
         """Get and return the name of the bulb
 
+        The name is only queried once, unless refresh is True
+
+        :args: - refresh : query the bulb even if the name is known
+               - slow : see get_color()
         :returns: Name of the bulb
         """
-        if self.connect():
-            time.sleep(0.5)
-            self.bulb.writeCharacteristic(40, "58")
-            self.bulb.waitForNotifications(1.0)
-            self.disconnect()
+        if self._name_cached and not refresh:
+            return self.name
+        if self._ensure_connected():
+            try:
+                self._query(_CMD_NAME, slow=slow)
+            finally:
+                self._release()
 
             return self.name
 
-    def set_name(self, name):
-        """Set the name of the bulb"""
-        if self.connect():
-            byteName = name.encode("utf-8")
-            command = "58"+byteName.hex()
-            self.bulb.writeCharacteristic(40, command)
-            self.disconnect()
+    def fetch_state(self, slow=False):
+        """Retrieve the color, brightness and name of the bulb in one go
 
-    def process_notification(self, data):
-        """Method called when a notification is send from the bulb
+        The three requests are sent back-to-back and their answers awaited together
+        (up to 1s), instead of one full request/response round-trip each.
+        See get_color() for slow.
+
+        :returns: tuple ((white, red, green, blue), brightness, name)
+        """
+        if self._ensure_connected():
+            try:
+                self._query(_CMD_BRIGHTNESS, _CMD_COLOR, _CMD_NAME, slow=slow)
+            finally:
+                self._release()
 
-        It is processed here rather than in the handleNotification() function,
-        because the latter is not a method of the Bulb class, therefore it can't access
-        the Bulb object's data
+            return (self.white, self.red, self.green, self.blue), self.brightness, self.name
 
-        :args: - data : the received data from the bulb in hex format
+    def _query(self, *commands, slow=False):
+        """Send get commands and wait (up to 1s in total) for the bulb's answer to each of them
+
+        Notifications answering other commands don't end the wait
+        If slow and the bulb hasn't sent any notification on this connection yet,
+        first wait (up to .5s) for one
+        """
+        try:
+            if slow and not self._ready:
+                # bluepy only handles notifications inside waitForNotifications(),
+                # so that's where the first one of the connection is awaited
+                self.bulb.waitForNotifications(0.5)
+            self._answered.difference_update(command[0] for command in commands)
+            for command in commands:
+                self._write(command)
+            deadline = time.monotonic() + 1.0
+            while any(command[0] not in self._answered for command in commands):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.bulb.waitForNotifications(remaining):
+                    break
+        except Exception:
+            self.disconnect()
+            raise
+
+    def _write(self, payload, withResponse=False):
+        """Write a payload to the control handle
+
+        If the write fails, the link is most likely broken : the bulb is marked
+        as disconnected before the error is raised, so the next call reconnects
         """
-        cmd = data[:1]
-        values = data[1:]
-        cmd = int(cmd.hex())
-
-        # Convert the brightness value
-        if cmd is 57:
-            self.brightness = int.from_bytes(values, 'little')
-
-        # Convert the color values
-        elif cmd is 35:
-            hex = values.hex()
-            self.red = int.from_bytes(bytes.fromhex(
-                hex[-4:]), "little") ^ int(0x3000)
-            self.green = int.from_bytes(bytes.fromhex(
-                hex[-8:-4]), "little") ^ int(0x2000)
-            self.blue = int.from_bytes(bytes.fromhex(
-                hex[-12:-8]), "little") ^ int(0x1000)
-            self.white = int.from_bytes(bytes.fromhex(hex[-16:-12]), "little")
-
-        # Convert the name
-        elif cmd is 58:
-            self.name = values.decode("utf-8")
-
-
-def discover_avea_bulbs():
+        try:
+            self.bulb.writeCharacteristic(_CONTROL_HANDLE, payload, withResponse)
+        except Exception:
+            self.disconnect()
+            raise
+
+    def set_name(self, name):
+        """Set the name of the bulb"""
+        if self._ensure_connected():
+            try:
+                command = _CMD_NAME + name.encode("utf-8")
+                self._write(command)
+                self.name = name
+                self._name_cached = True
+            finally:
+                self._release()
+
+
+def discover_avea_bulbs(timeout=4.0, max_age=10.0):
     """Scanning feature
 
     Scan the BLE neighborhood for an Avea bulb
     This method requires the script to be launched as root
+    Bulbs are recognized by their advertised (complete or short) local name
+    The result of a scan that found bulbs is reused by the calls made in the following
+    max_age seconds, unless they ask for a longer scan
+
+    :args: - timeout : duration of the scan in seconds, defaults to 4
+           - max_age : how long a scan result is reused, in seconds. 0 to always scan
     Returns the list of nearby bulbs
     """
+    global _last_scan
+    scanned_at, scanned_for, bulb_list = _last_scan
+    if (scanned_at is not None and timeout <= scanned_for
+            and time.monotonic() - scanned_at < max_age):
+        return list(bulb_list)
+
     bulb_list = []
-    from bluepy.btle import Scanner, DefaultDelegate
+    from bluepy.btle import Scanner, DefaultDelegate, ScanEntry
 
     class ScanDelegate(DefaultDelegate):
         """Overwrite of the Scan Delegate class"""
@@ -298,39 +630,122 @@ def discover_avea_bulbs():
             DefaultDelegate.__init__(self)
 
     scanner = Scanner().withDelegate(ScanDelegate())
-    devices = scanner.scan(4.0)
+    devices = scanner.scan(timeout)
     for dev in devices:
-        for (adtype, desc, value) in dev.getScanData():
-            if "Avea" in value:
-                bulb_list.append(Bulb(dev.addr))
-    return bulb_list
+        name = dev.getValueText(ScanEntry.COMPLETE_LOCAL_NAME) or dev.getValueText(ScanEntry.SHORT_LOCAL_NAME)
+        if name and name.startswith("Avea"):
+            bulb_list.append(Bulb(dev.addr))
+    # An empty result is not kept, so that a retry scans again
+    _last_scan = (time.monotonic(), timeout, bulb_list) if bulb_list else (None, 0, [])
+    return list(bulb_list)
+
+
+def get_all_states(bulbs, refresh=False):
+    """Retrieve the color of several bulbs in parallel
+
+    Each bulb is an independent BLE peer with its own bluepy-helper,
+    so their get_color() calls are run concurrently in a thread pool.
+
+    :args: - bulbs : list of Bulb objects
+           - refresh : passed to get_color(), True to query every bulb even if its color is known
+    :returns: list of (white, red, green, blue) tuples, in the same order as bulbs
+    """
+    if not bulbs:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(bulbs)) as executor:
+        return list(executor.map(lambda bulb: bulb.get_color(refresh), bulbs))
 
 
 def compute_brightness(brightness):
-    """Return the hex code for the specified brightness"""
-    value = hex(int(brightness))[2:]
-    value = value.zfill(4)
-    value = value[2:] + value[:2] # how to swap endianness
+    """Return the payload for the specified brightness
 
-    return "57" + value
+    The value is clamped between 0 and 4095 with check_bounds()
+    """
+    return _brightness_payload(check_bounds(brightness))
+
+
+def _brightness_payload(brightness):
+    """Return the payload for a brightness already clamped between 0 and 4095"""
+    return _BRIGHTNESS_STRUCT.pack(_CMD_BRIGHTNESS[0], brightness)
 
 
 def compute_color(w=2000, r=0, g=0, b=0):
-    """Return the hex code for the specified colors"""
-    color = "35"
-    fading = "1101"
-    unknow = "0a00"
-    white = (int(w) | int(0x8000)).to_bytes(2, byteorder='little').hex()
-    red = (int(r) | int(0x3000)).to_bytes(2, byteorder='little').hex()
-    green = (int(g) | int(0x2000)).to_bytes(2, byteorder='little').hex()
-    blue = (int(b) | int(0x1000)).to_bytes(2, byteorder='little').hex()
+    """Return the payload for the specified colors
+
+    Each value is clamped between 0 and 4095 with check_bounds() (so floats
+    and numeric strings are accepted)
+    Payloads are cached, as the same colors tend to be sent over and over
+    """
+    return _color_payload(check_bounds(w), check_bounds(r), check_bounds(g), check_bounds(b))
 
-    return color + fading + unknow + white + red + green + blue
+
+@functools.lru_cache(maxsize=512)
+def _color_payload(w, r, g, b):
+    """Return the payload for colors already clamped between 0 and 4095, see compute_color()
+
+    Used by the Bulb methods, which clamp their arguments once with check_bounds()
+    """
+    return _COLOR_STRUCT.pack(_CMD_COLOR[0], _COLOR_FADING, _COLOR_UNKNOW,
+                              w | 0x8000, r | 0x3000, g | 0x2000, b | 0x1000)
+
+
+def _clamp_rgb(value):
+    """Return value as an int between 0 and 255, see check_bounds()"""
+    return _clamp(value, 255)
+
+
+def _build_transition_payloads(rows):
+    """Return the color payloads of a transition, one per frame
+
+    The rows are (red, green, blue) values (0 to 255) computed from clamped endpoints,
+    so they are packed as-is, without going through compute_color().
+    Every frame is packed into the same buffer, whose header is only packed once,
+    and a frame identical to the previous one reuses its bytes instead of a new copy.
+    """
+    buffer = bytearray(_COLOR_STRUCT.size)
+    _COLOR_STRUCT.pack_into(buffer, 0, _CMD_COLOR[0], _COLOR_FADING, _COLOR_UNKNOW, 0, 0, 0, 0)
+    pack_into = _COLOR_VALUES_STRUCT.pack_into
+    payloads = []
+    payload = None
+    for r, g, b in rows:
+        pack_into(buffer, 5, 0x8000, r << 4 | 0x3000, g << 4 | 0x2000, b << 4 | 0x1000)
+        if buffer != payload:
+            payload = bytes(buffer)
+        payloads.append(payload)
+    return payloads
+
+
+@functools.lru_cache(maxsize=32)
+def _transition_payloads(inits, targets, iterations):
+    """Return the color payloads of a transition between two (red, green, blue) colors
+
+    The three channels are interpolated in a single pass over the steps, and the
+    result is cached, as transitions tend to go back and forth between the same colors.
+    """
+    (red, green, blue), (target_red, target_green, target_blue) = inits, targets
+    delta_red, delta_green, delta_blue = target_red - red, target_green - green, target_blue - blue
+    return tuple(_build_transition_payloads(
+        [(red + round(delta_red * step),
+          green + round(delta_green * step),
+          blue + round(delta_blue * step))
+         for step in _transition_steps(iterations)]))
+
+
+@functools.lru_cache(maxsize=32)
+def _transition_steps(iterations):
+    """Return how much of a transition is done at each of its steps, from 1/iterations to 1
+
+    Cached, as a given duration and fps always lead to the same steps.
+    """
+    return tuple(i / iterations for i in range(1, iterations + 1))
 
 
 def compute_transition_table(init, target, iterations):
     """Compute a list of values for a smooth transition 
     between 2 numbers. 
+
+    The values are evenly spread, the initial value is excluded
+    and the last one is always the target.
     
     Args:
         init (int): initial value
@@ -340,90 +755,44 @@ def compute_transition_table(init, target, iterations):
     Returns:
         list: the transition list
     """
-    # Get the increment and create the inital table
-    if target < init:
-        incr = -1
-    else:
-        incr = 1
-    tmp_range = [i for i in range(init, target, incr)]
-    # if tmp range is 0 len, that means there is no change for this color,
-    if len(tmp_range) is 0:
-        tmp_range.append(target)
-    # If the range is too long, pop some values until we are ok
-    pop_index = 1
-    while len(tmp_range) > iterations:
-        tmp_range.pop(pop_index % len(tmp_range))
-        pop_index += 4
-
-    # If the range is too short, add some values twice until we are ok
-    insert_index = 0
-    while len(tmp_range) < iterations:
-        insert_index = insert_index % len(tmp_range)
-        tmp_range.insert(
-            insert_index, tmp_range[insert_index-1 if insert_index-1 > 0 else 0])
-        insert_index += 4
-
-    # Pop the first and append the index
-    tmp_range.pop(0)
-    tmp_range.append(target)
-    return tmp_range
+    delta = target - init
+    return [init + round(delta * step) for step in _transition_steps(iterations)]
 
 
 def check_bounds(value):
     """Check if the given value is out-of-bounds (0 to 4095)
 
+    Ints, the usual case, are clamped right away. Other real numbers (float,
+    numpy scalar, Fraction...) are clamped without a try/except, and other
+    values (numeric strings, Decimal...) go through int()
+
     :args: the value to be checked
-    :returns: the checked value
+    :returns: the checked value, as an int clamped between 0 and 4095
     """
-    try:
-        if int(value) > 4095:
-            return 4095
-
-        elif int(value) < 0:
-            return 0
-
+    if type(value) is int:
+        return 0 if value < 0 else 4095 if value > 4095 else value
+    return _clamp(value, 4095)
+
+
+def _clamp(value, upper):
+    """Return value as an int between 0 and upper, or 0 if it is not a number"""
+    if type(value) is not int:
+        if type(value) is float or isinstance(value, numbers.Real):
+            if value != value:  # NaN
+                print("Value was not a number, returned default value of 0")
+                return 0
         else:
-            return value
-            
-    except ValueError:
-        print("Value was not a number, returned default value of 0")
-        return 0
-
-
-class AveaDelegate(bluepy.btle.DefaultDelegate):
-    """Overwrite of Bluepy's DefaultDelegate class
-
-    It adds a bulb object that refers to the Bulb.bulb object which
-    called this delegate.
-    It is used to call the bulb.process_notification() function
-    """
-
-    def __init__(self, bulbObject):
-        self.bulb = bulbObject
-
-    def handleNotification(self, cHandle, data):
-        """Overwrite of the async function called when a device sends a notification.
-
-        It's just passing the data to process_notification(),
-        which is linked to the emitting bulb (via self.bulb).
-        This allows us to use the bulb's functions and interact with the response.
-        """
-        self.bulb.process_notification(data)
-
-
-class AveaPeripheral(bluepy.btle.Peripheral):
-    """Overwrite of the Bluepy 'Peripheral' class.
-
-    It overwrites only the default writeCharacteristic() method
-    """
-
-    def writeCharacteristic(self, handle, val, withResponse=False):
-        """Overwrite of the writeCharacteristic method
-
-        By default it only allows strings as input
-        As we craft our own paylod, we need to bypass this behavior
-        and send hex values directly
-        """
-        cmd = "wrr" if withResponse else "wr"
-        self._writeCmd("%s %X %s\n" % (cmd, handle, val))
-        return self._getResp('wr')
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                print("Value was not a number, returned default value of 0")
+                return 0
+    return 0 if value < 0 else upper if value > upper else int(value)
+
+
+def __getattr__(name):
+    """Give access to the bluepy based classes, importing bluepy on first use"""
+    if name in ("AveaDelegate", "AveaPeripheral"):
+        from . import _bluepy
+        return getattr(_bluepy, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -22,4 +22,7 @@ setuptools.setup(
     install_requires=[
         'bluepy',
     ],
+    extras_require={
+        'aio': ['bleak'],
+    },
 )